@@ -1,5 +1,6 @@
 import tkinter as tk
 from tkinter import ttk
+import argparse
 import threading
 import pyaudio
 import configparser
@@ -9,6 +10,9 @@ import logging
 import numpy
 from pydub import AudioSegment
 import wave
+from recorder import PracticeRecorder, PyAudioInputSource
+from profiler import SessionProfiler, DEFAULT_INTERVAL
+from synth import synthesize_click
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
@@ -34,6 +38,9 @@ class MetronomeApp:
         self.timer_job = None # To store the after job ID for the stopwatch
         self.beat_count = 0 # Initialize beat counter
         self.beat_count_var = tk.IntVar(value=0) # Thread-safe beat counter for UI
+        self.beat_listeners = [] # Callables(beat_index, perf_counter time) notified after each click
+        self.recorder = None # Active PracticeRecorder, if recording
+        self.profiler = None # SessionProfiler attached by --profile
     # audio_frames / WAV output removed (was used for debugging)
         self.load_config()
 
@@ -92,23 +99,10 @@ class MetronomeApp:
             tk.messagebox.showerror("Audio Error", "Could not initialize audio. Metronome functionality may be limited.")
 
     def _prepare_audio_for_bpm(self, bpm_val):
-        # Generate a simple click sound based on BPM
-        frequency = 440  # Hz (Higher frequency for a sharper sound)
-        # Make the click duration a small fraction of the beat interval, e.g., 10%
-        click_duration = (60.0 / bpm_val) * 0.1 # seconds
-        if click_duration > 0.05: # Cap the click duration to a reasonable max
-            click_duration = 0.05
-
-        t = numpy.linspace(0, click_duration, int(click_duration * self.samplerate), False)
-        amplitude = 0.5
-        wave_data = amplitude * numpy.sin(frequency * t * 2 * numpy.pi)
-
-        # Apply an exponential decay envelope
-        decay_envelope = numpy.exp(-numpy.linspace(0, 5, len(wave_data))) # Exponential decay
-        wave_data = wave_data * decay_envelope
-
-        self.audio_data = (numpy.array(wave_data) * 32767).astype(numpy.int16).tobytes()
-        logging.info(f"Generated click for {bpm_val} BPM with duration {click_duration:.4f}s.")
+        # Generate a simple click sound based on BPM (shared with the multi-instance mixer)
+        wave_data = synthesize_click(bpm_val, self.samplerate)
+        self.audio_data = (wave_data * 32767).astype(numpy.int16).tobytes()
+        logging.info(f"Generated click for {bpm_val} BPM with duration {len(wave_data) / self.samplerate:.4f}s.")
 
     def increase_bpm(self):
         current_bpm = self.bpm.get()
@@ -212,6 +206,8 @@ class MetronomeApp:
         self.start_button.pack(side=tk.LEFT, padx=8)
         self.stop_button = ttk.Button(button_frame, text="Stop", command=self.stop_metronome, state=tk.DISABLED)
         self.stop_button.pack(side=tk.LEFT, padx=8)
+        self.record_button = ttk.Button(button_frame, text="Record", command=self.toggle_recording)
+        self.record_button.pack(side=tk.LEFT, padx=8)
 
         exit_frame = ttk.Frame(self.main_frame, style='Card.TFrame')
         exit_frame.pack(pady=6)
@@ -279,6 +275,8 @@ class MetronomeApp:
                     logging.error(f"PyAudio error writing to stream: {pa_e}")
                 except Exception as e:
                     logging.error(f"General error writing to audio stream: {e}")
+                else:
+                    self._notify_beat_listeners(start_beat_time)
 
             elapsed_time = time.perf_counter() - start_beat_time
             sleep_time = interval - elapsed_time
@@ -293,19 +291,27 @@ class MetronomeApp:
             # Update beat counter (thread-safe)
             self.beat_count_var.set(self.beat_count_var.get() + 1)
 
+    def _notify_beat_listeners(self, beat_time):
+        beat_index = self.beat_count_var.get()
+        for listener in self.beat_listeners:
+            try:
+                listener(beat_index, beat_time)
+            except Exception as e:
+                logging.error(f"Error in beat listener {listener!r}: {e}")
+
     def start_metronome(self):
         if not self.is_playing:
             self.is_playing = True
             self.stop_event.clear() # Clear the stop event for a new run
-            # no audio frame recording necessary
+            # Reset the counter before the thread starts so its first beat is beat 0
+            self.beat_count_var.set(0)
             self.metronome_thread = threading.Thread(target=self._play_metronome)
             self.metronome_thread.daemon = True # Allow the program to exit even if thread is running
             self.metronome_thread.start()
             self.start_button.config(state=tk.DISABLED)
             self.stop_button.config(state=tk.NORMAL)
 
-            # Stopwatch and Beat Count Initialization
-            self.beat_count_var.set(0) # Reset counter
+            # Stopwatch Initialization
             self.start_time = time.time() # Start the stopwatch
             self.update_stopwatch() # Start updating the stopwatch display
 
@@ -329,9 +335,37 @@ class MetronomeApp:
 
             logging.info("Metronome stopped.")
 
+    def toggle_recording(self):
+        if self.recorder:
+            self.beat_listeners.remove(self.recorder.mark_beat)
+            self.recorder.stop()
+            self.recorder = None
+            self.record_button.config(text="Record")
+            return
+        if not self.p:
+            logging.warning("Cannot record: audio is not initialized.")
+            return
+        path = f"practice-{time.strftime('%Y%m%d-%H%M%S')}.wav"
+        # Markers should land where the click was heard, not where it was written
+        output_latency = self.stream.get_output_latency() if self.stream else 0.0
+        self.recorder = PracticeRecorder(path, output_latency=output_latency)
+        try:
+            self.recorder.start(PyAudioInputSource(self.p, samplerate=self.samplerate, block_frames=CHUNK_SIZE))
+        except Exception as e:
+            logging.error(f"Error opening input stream for recording: {e}")
+            self.recorder = None
+            return
+        self.beat_listeners.append(self.recorder.mark_beat)
+        self.record_button.config(text="Stop Rec")
+
     def on_closing(self):
         logging.info("Application closing. Stopping metronome and saving config.")
         self.stop_metronome()
+        if self.recorder:
+            self.toggle_recording()
+        if self.profiler and self.profiler.running:
+            # The metronome thread was just joined; don't wait on one that may be stuck waiting for Tk
+            self.profiler.stop(handoff_timeout=0) # Write what was collected so far
         self.save_config()
 
 
@@ -342,10 +376,31 @@ class MetronomeApp:
             self.p.terminate()
         self.root.destroy()
 
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="GUI metronome")
+    parser.add_argument('--profile', type=float, metavar='SECONDS',
+                        help="Profile the Tk and audio threads for SECONDS, then write the results")
+    parser.add_argument('--profile-dir', help="Output directory for profile results (default: profile-<timestamp>)")
+    parser.add_argument('--profile-interval', type=float, default=DEFAULT_INTERVAL,
+                        help="Seconds between stack samples while profiling")
+    parser.add_argument('--cprofile', action='store_true', help="Also capture cProfile stats while profiling")
+    parser.add_argument('--tracemalloc', action='store_true', help="Also capture tracemalloc allocations while profiling")
+    return parser.parse_args(argv)
+
 if __name__ == "__main__":
+    args = parse_args()
     root = tk.Tk()
     app = MetronomeApp(root)
     root.protocol("WM_DELETE_WINDOW", app.on_closing) # Handle window close event
+    if args.profile:
+        profiler = SessionProfiler(args.profile,
+                                   out_dir=args.profile_dir,
+                                   interval=args.profile_interval,
+                                   use_cprofile=args.cprofile,
+                                   use_tracemalloc=args.tracemalloc)
+        profiler.attach(app)
+        profiler.start()
+        root.after(int(args.profile * 1000), profiler.stop, root) # Polls via root.after, never blocks Tk
     try:
         root.mainloop()
     except Exception as e:
@@ -0,0 +1,254 @@
+"""
+Multi-instance click mixer.
+
+Runs several independent metronome engines (each with its own tempo, accent
+pattern, gain and pan or output channel) through one numpy mixer into a
+single, optionally multi-channel, PyAudio output stream driven by one audio
+thread. Engines are kept in a heap ordered by their next onset, so a block
+only touches engines that actually click in it, plus the clicks still
+sounding; work scales with active clicks rather than with instances.
+
+Usage (one --click per instance: BPM[:BEATS_PER_BAR[:GAIN[:PAN|chN]]], outputs numbered from 1):
+    python mixer.py --click 120:4:0.8:-1 --click 90:3:0.8:1
+    python mixer.py --channels 4 --click 100:4:1:ch2 --click 72:3:1:ch3
+"""
+import argparse
+import heapq
+import itertools
+import logging
+import threading
+
+import numpy
+import pyaudio
+
+from synth import SAMPLERATE, synthesize_click
+
+BLOCK_FRAMES = 1024
+ACCENT = 1.0  # Gain of the first beat of a bar
+OFFBEAT = 0.6  # Gain of the other beats
+
+
+def accent_pattern(beats_per_bar):
+    return [ACCENT] + [OFFBEAT] * (beats_per_bar - 1)
+
+
+class ClickEngine:
+    """One metronome voice: tempo, accent pattern and placement in the output."""
+
+    def __init__(self, bpm=100, pattern=None, gain=1.0, pan=0.0, channel=None, name=None):
+        self.bpm = bpm
+        self.pattern = list(pattern) if pattern else [ACCENT]
+        self.gain = gain
+        self.pan = pan  # -1 (left) .. 1 (right), used when channel is None
+        self.channel = channel  # 0-based output channel for a separate click feed
+        self.name = name
+        self.running = False
+        self.beats_played = 0
+        self._generation = 0  # Bumped on start/stop so stale heap entries are ignored
+
+    def channel_gains(self, channels):
+        gains = numpy.zeros(channels, dtype=numpy.float32)
+        if self.channel is not None:
+            if not 0 <= self.channel < channels:
+                raise ValueError(f"Output channel {self.channel + 1} out of range for {channels}-channel output")
+            gains[self.channel] = self.gain
+        elif channels == 1:
+            gains[0] = self.gain
+        else:
+            # Constant-power pan across the first two channels
+            angle = (min(max(self.pan, -1.0), 1.0) + 1) * numpy.pi / 4
+            gains[0] = self.gain * numpy.cos(angle)
+            gains[1] = self.gain * numpy.sin(angle)
+        return gains
+
+
+class ClickMixer:
+    def __init__(self, channels=1, samplerate=SAMPLERATE):
+        self.channels = channels
+        self.samplerate = samplerate
+        self.engines = []
+        self.frame = 0  # Output frames rendered so far
+        self._schedule = []  # Heap of (onset frame, seq, generation, engine, exact onset)
+        self._seq = itertools.count()
+        self._voices = []  # [wave, position, channel gains] for clicks still sounding
+        self._clicks = {}  # bpm -> float32 click, shared by engines at the same tempo
+        self._lock = threading.Lock()  # Engines are started/stopped from other threads
+        self._mix = numpy.zeros((0, channels), dtype=numpy.float32)
+
+    def add(self, engine):
+        engine.channel_gains(self.channels)  # Validate routing up front
+        with self._lock:
+            self.engines.append(engine)
+        return engine
+
+    def start(self, engine, delay=0.0):
+        with self._lock:
+            engine._generation += 1
+            engine.running = True
+            engine.beats_played = 0
+            onset = float(self.frame + int(round(delay * self.samplerate)))
+            self._push(engine, onset)
+
+    def stop(self, engine):
+        with self._lock:
+            engine._generation += 1
+            engine.running = False
+
+    def _push(self, engine, onset):
+        heapq.heappush(self._schedule, (int(round(onset)), next(self._seq), engine._generation, engine, onset))
+
+    def _click(self, bpm):
+        click = self._clicks.get(bpm)
+        if click is None:
+            click = self._clicks[bpm] = synthesize_click(bpm, self.samplerate).astype(numpy.float32)
+        return click
+
+    def render(self, frames):
+        """Mix the next `frames` frames; returns interleaved int16 samples, shape (frames, channels)."""
+        if len(self._mix) < frames:
+            self._mix = numpy.zeros((frames, self.channels), dtype=numpy.float32)
+        mix = self._mix[:frames]
+        mix.fill(0.0)
+        block_start, block_end = self.frame, self.frame + frames
+
+        with self._lock:
+            # Advance the clock under the lock so start() never schedules an onset in a rendered block
+            self.frame = block_end
+            # Only engines with an onset inside this block are touched
+            while self._schedule and self._schedule[0][0] < block_end:
+                _, _, generation, engine, onset = heapq.heappop(self._schedule)
+                if generation != engine._generation:
+                    continue  # Stopped or restarted since this onset was scheduled
+                accent = engine.pattern[engine.beats_played % len(engine.pattern)]
+                gains = engine.channel_gains(self.channels) * accent
+                self._voices.append([self._click(engine.bpm), int(round(onset)) - block_start, gains])
+                engine.beats_played += 1
+                # Exact float onsets keep long runs from drifting at non-integer intervals
+                self._push(engine, onset + 60.0 * self.samplerate / engine.bpm)
+
+        still_sounding = []
+        for voice in self._voices:
+            wave, position, gains = voice
+            start = max(position, 0)  # Offset in this block
+            offset = max(-position, 0)  # Samples of the click already played
+            n = min(len(wave) - offset, frames - start)
+            if n <= 0:
+                continue  # Onset fell before this block and the click has already ended
+            mix[start:start + n] += wave[offset:offset + n, None] * gains
+            if offset + n < len(wave):
+                voice[1] = position - frames
+                still_sounding.append(voice)
+        self._voices = still_sounding
+
+        numpy.clip(mix, -1.0, 1.0, out=mix)
+        return (mix * 32767).astype(numpy.int16)
+
+    @property
+    def active_clicks(self):
+        return len(self._voices)
+
+
+class MixerPlayer:
+    """Plays a ClickMixer through one PyAudio stream on a single audio thread."""
+
+    def __init__(self, mixer, block_frames=BLOCK_FRAMES):
+        self.mixer = mixer
+        self.block_frames = block_frames
+        self.p = None
+        self.stream = None
+        self.thread = None
+        self.stop_event = threading.Event()
+
+    def start(self):
+        self.p = pyaudio.PyAudio()
+        try:
+            self.stream = self.p.open(format=pyaudio.paInt16,
+                                      channels=self.mixer.channels,
+                                      rate=self.mixer.samplerate,
+                                      output=True,
+                                      frames_per_buffer=self.block_frames)
+        except Exception:
+            # e.g. the device has fewer output channels than requested
+            self.p.terminate()
+            self.p = None
+            raise
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self._play, daemon=True)
+        self.thread.start()
+        logging.info(f"Mixer playing {len(self.mixer.engines)} engines on {self.mixer.channels} channel(s).")
+
+    def _play(self):
+        while not self.stop_event.is_set():
+            try:
+                block = self.mixer.render(self.block_frames)
+                self.stream.write(block.tobytes())  # Blocks until the device needs more, pacing the loop
+            except Exception as e:
+                logging.error(f"Error mixing or writing audio: {e}")
+                self.stop_event.set()  # Wake anyone waiting on the player
+                break
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread and self.thread.is_alive():
+            self.thread.join(timeout=1)
+        if self.stream:
+            self.stream.stop_stream()
+            self.stream.close()
+            self.stream = None
+        if self.p:
+            self.p.terminate()
+            self.p = None
+
+
+def parse_click(spec):
+    """Build a ClickEngine from 'BPM[:BEATS_PER_BAR[:GAIN[:PAN|chN]]]'; chN counts outputs from 1."""
+    parts = spec.split(':')
+    try:
+        bpm = max(30, min(300, int(parts[0])))
+        beats_per_bar = int(parts[1]) if len(parts) > 1 and parts[1] else 4
+        gain = float(parts[2]) if len(parts) > 2 and parts[2] else 1.0
+        pan, channel = 0.0, None
+        if len(parts) > 3 and parts[3]:
+            if parts[3].startswith('ch'):
+                channel = int(parts[3][2:]) - 1
+            else:
+                pan = float(parts[3])
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid click spec {spec!r}")
+    if beats_per_bar < 1:
+        raise argparse.ArgumentTypeError(f"invalid beats per bar in {spec!r}")
+    if channel is not None and channel < 0:
+        raise argparse.ArgumentTypeError(f"output channels are numbered from 1 in {spec!r}")
+    return ClickEngine(bpm=bpm, pattern=accent_pattern(beats_per_bar), gain=gain, pan=pan,
+                       channel=channel, name=spec)
+
+
+def run_cli(argv=None):
+    parser = argparse.ArgumentParser(description="Play several metronomes mixed into one output stream.")
+    parser.add_argument('--click', type=parse_click, action='append', required=True,
+                        metavar='BPM[:BEATS[:GAIN[:PAN|chN]]]', help="Add a metronome instance (repeatable)")
+    parser.add_argument('--channels', type=int, default=2, help="Output channels (default: 2)")
+    args = parser.parse_args(argv)
+    if args.channels < 1:
+        parser.error("--channels must be at least 1")
+
+    mixer = ClickMixer(channels=args.channels)
+    for engine in args.click:
+        try:
+            mixer.add(engine)
+        except ValueError as e:
+            parser.error(str(e))
+        mixer.start(engine)
+    player = MixerPlayer(mixer)
+    player.start()
+    try:
+        player.stop_event.wait()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        player.stop()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    run_cli()
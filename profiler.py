@@ -0,0 +1,287 @@
+"""
+Session profiler for the GUI (Tk) and audio threads.
+
+Started by ``python main.py --profile SECONDS``. For the requested duration it
+records per-thread CPU time and samples the Tk and audio thread stacks on a
+background thread (wall-time sampling, so time blocked in stream.write shows
+up as well as time spent computing). Optionally it also runs cProfile and
+tracemalloc. Results land in one directory:
+
+- summary.txt        per-thread CPU time, sample counts and hottest frames
+- stacks.collapsed   "thread;outer;...;inner count" lines for flamegraph.pl/speedscope
+- profile.pstats     cProfile stats (with --cprofile)
+- tracemalloc.txt / tracemalloc.snapshot   top allocations (with --tracemalloc)
+
+Sampling at the default 100 Hz costs well under 1% CPU, so it can stay on
+during a real session; cProfile adds noticeably more.
+"""
+import cProfile
+import collections
+import logging
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+
+DEFAULT_INTERVAL = 0.01  # Seconds between stack samples
+PROFILE_HANDOFF_TIMEOUT = 2.5  # Longest wait for a thread to disable its cProfile (one beat at 30 BPM)
+PROFILE_HANDOFF_POLL_MS = 50  # How often the Tk thread checks whether the handoff is done
+TOP_FRAMES = 10
+
+
+def thread_cpu_time(ident):
+    """CPU seconds used so far by the thread with `ident`, or None if unsupported."""
+    if ident == threading.get_ident():
+        return time.thread_time()
+    try:
+        return time.clock_gettime(time.pthread_getcpuclockid(ident))
+    except (AttributeError, OSError):
+        return None  # Windows has no per-thread clock for other threads
+
+
+class SessionProfiler:
+    def __init__(self, duration, out_dir=None, interval=DEFAULT_INTERVAL,
+                 use_cprofile=False, use_tracemalloc=False):
+        self.duration = duration
+        self.out_dir = out_dir or f"profile-{time.strftime('%Y%m%d-%H%M%S')}"
+        self.interval = interval
+        self.use_cprofile = use_cprofile
+        self.use_tracemalloc = use_tracemalloc
+        self.running = False
+        self.samples = collections.Counter()  # (thread name, stack tuple) -> count
+        self._threads = {}  # ident -> name of threads being sampled
+        self._cpu = collections.defaultdict(float)  # name -> CPU seconds from finished runs
+        self._cpu_start = {}  # ident -> thread CPU time when profiling/the run started
+        self._profiles = []  # Disabled cProfile.Profile objects to merge at stop
+        self._main_profile = None
+        self._thread_profiles = {}  # ident -> (Profile, disabled Event) still enabled on other threads
+        self._written = False  # Results are on disk; late thread profiles are disabled but not merged
+        self._labels = {}  # code object -> frame label cache
+        self._stop_event = threading.Event()
+        self._sampler = None
+        self._started_at = None
+        self._lock = threading.Lock()
+
+    def attach(self, app):
+        """Profile `app`: its Tk thread (the caller) and every metronome thread it starts."""
+        app.profiler = self
+        app._play_metronome = self.wrap_target('audio', app._play_metronome)
+        # Runs on the audio thread after every click, so it can drop its own cProfile promptly
+        app.beat_listeners.append(lambda beat_index, beat_time: self.checkpoint())
+        self.watch_current_thread('tk')
+
+    def watch_current_thread(self, name):
+        ident = threading.get_ident()
+        with self._lock:
+            self._threads[ident] = name
+            self._cpu_start[ident] = time.thread_time()
+
+    def wrap_target(self, name, target):
+        """Wrap a thread target so the thread is sampled, timed and (optionally) cProfiled."""
+        def run(*args, **kwargs):
+            if not self.running:
+                return target(*args, **kwargs)
+            ident = threading.get_ident()
+            self.watch_current_thread(name)
+            profile = self._enable_cprofile()
+            if profile:
+                with self._lock:
+                    self._thread_profiles[ident] = (profile, threading.Event())
+            try:
+                return target(*args, **kwargs)
+            finally:
+                self._release_thread_profile(ident)
+                with self._lock:
+                    start = self._cpu_start.pop(ident, None)
+                    self._threads.pop(ident, None)
+                    if start is not None:
+                        self._cpu[name] += time.thread_time() - start
+        return run
+
+    def _enable_cprofile(self):
+        if not self.use_cprofile:
+            return None
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Python 3.12+ profiles every thread from a single enabled profiler
+            return None
+        return profile
+
+    def checkpoint(self):
+        """Call periodically from a wrapped thread; disables its cProfile once profiling has stopped.
+
+        Before Python 3.12 a profiler can only be disabled from its own thread.
+        """
+        if not self.running:
+            self._release_thread_profile(threading.get_ident())
+
+    def _release_thread_profile(self, ident):
+        with self._lock:
+            entry = self._thread_profiles.pop(ident, None)
+        if entry:
+            profile, disabled = entry
+            profile.disable()
+            with self._lock:
+                if not self._written:
+                    self._profiles.append(profile)
+            disabled.set()
+
+    def start(self):
+        if self.running:
+            return
+        self.running = True
+        self._written = False
+        self._started_at = time.perf_counter()
+        with self._lock:
+            for ident in self._threads:
+                self._cpu_start[ident] = thread_cpu_time(ident)
+        if self.use_tracemalloc:
+            tracemalloc.start(25)
+        self._main_profile = self._enable_cprofile()
+        if self._main_profile:
+            self._profiles.append(self._main_profile)
+        self._stop_event.clear()
+        self._sampler = threading.Thread(target=self._sample_loop, name='profiler-sampler', daemon=True)
+        self._sampler.start()
+        logging.info(f"Profiling for {self.duration}s; results will be written to {self.out_dir}.")
+
+    def _sample_loop(self):
+        while not self._stop_event.wait(self.interval):
+            frames = sys._current_frames()
+            with self._lock:
+                threads = list(self._threads.items())
+            for ident, name in threads:
+                frame = frames.get(ident)
+                if frame is not None:
+                    self.samples[(name, self._stack(frame))] += 1
+
+    def _stack(self, frame):
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            label = self._labels.get(code)
+            if label is None:
+                name = getattr(code, 'co_qualname', code.co_name)
+                label = f"{name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+                self._labels[code] = label
+            stack.append(label)
+            frame = frame.f_back
+        stack.reverse()  # Outermost first, as collapsed stacks expect
+        return tuple(stack)
+
+    def stop(self, root=None, handoff_timeout=PROFILE_HANDOFF_TIMEOUT):
+        """Stop collecting and write the results; returns the output directory.
+
+        Other threads disable their own cProfile at their next checkpoint, and
+        the audio thread may need the Tk thread (e.g. an IntVar.get()) to reach
+        it. So with a Tk `root` the handoff is polled with root.after() and the
+        results are written once it completes, instead of blocking the caller.
+        """
+        if not self.running:
+            return self.out_dir
+        elapsed = time.perf_counter() - self._started_at
+        self.running = False
+        if self._main_profile:
+            self._main_profile.disable()
+        self._stop_event.set()
+        self._sampler.join()
+        cpu = self._thread_cpu()
+        deadline = time.perf_counter() + handoff_timeout
+        if root is not None:
+            self._poll_thread_profiles(root, deadline, elapsed, cpu)
+        else:
+            self._wait_for_thread_profiles(deadline)
+            self._write_results(elapsed, cpu)
+        return self.out_dir
+
+    def _thread_cpu(self):
+        cpu = dict(self._cpu)
+        with self._lock:
+            for ident, name in self._threads.items():
+                start = self._cpu_start.get(ident)
+                now = thread_cpu_time(ident)
+                if start is not None and now is not None:
+                    cpu[name] = cpu.get(name, 0.0) + now - start
+                else:
+                    cpu.setdefault(name, None)
+        return cpu
+
+    def _poll_thread_profiles(self, root, deadline, elapsed, cpu):
+        with self._lock:
+            pending = bool(self._thread_profiles)
+        if pending and time.perf_counter() < deadline:
+            root.after(PROFILE_HANDOFF_POLL_MS, self._poll_thread_profiles, root, deadline, elapsed, cpu)
+        else:
+            self._write_results(elapsed, cpu)
+
+    def _wait_for_thread_profiles(self, deadline):
+        with self._lock:
+            pending = list(self._thread_profiles.values())
+        for profile, disabled in pending:
+            disabled.wait(max(0.0, deadline - time.perf_counter()))
+
+    def _write_results(self, elapsed, cpu):
+        with self._lock:
+            self._written = True
+            if self._thread_profiles:
+                logging.warning(f"{len(self._thread_profiles)} thread(s) did not stop cProfile in time; "
+                                f"their stats are left out of profile.pstats.")
+        os.makedirs(self.out_dir, exist_ok=True)
+        self._write_collapsed()
+        self._write_summary(elapsed, cpu)
+        if self._profiles:
+            self._write_pstats()
+        if self.use_tracemalloc:
+            self._write_tracemalloc()
+            tracemalloc.stop()
+        logging.info(f"Profile written to {self.out_dir}.")
+
+    def _write_collapsed(self):
+        with open(os.path.join(self.out_dir, 'stacks.collapsed'), 'w') as out:
+            for (name, stack), count in sorted(self.samples.items()):
+                out.write(f"{';'.join((name,) + stack)} {count}\n")
+
+    def _write_summary(self, elapsed, cpu):
+        per_thread = collections.Counter()
+        leaves = collections.defaultdict(collections.Counter)
+        for (name, stack), count in self.samples.items():
+            per_thread[name] += count
+            if stack:
+                leaves[name][stack[-1]] += count
+
+        lines = [f"Profiled {elapsed:.1f}s, sampling every {self.interval * 1000:.0f} ms", ""]
+        lines.append("CPU time per thread:")
+        for name, seconds in sorted(cpu.items()):
+            if seconds is None:
+                lines.append(f"  {name:<8} n/a")
+            else:
+                lines.append(f"  {name:<8} {seconds:8.3f}s ({seconds / elapsed:6.1%} of wall time)")
+        for name in sorted(per_thread):
+            total = per_thread[name]
+            lines.extend(["", f"Hottest frames in '{name}' ({total} samples):"])
+            for label, count in leaves[name].most_common(TOP_FRAMES):
+                lines.append(f"  {count / total:6.1%}  {label}")
+        with open(os.path.join(self.out_dir, 'summary.txt'), 'w') as out:
+            out.write("\n".join(lines) + "\n")
+
+    def _write_pstats(self):
+        stats = None
+        for profile in self._profiles:
+            if stats is None:
+                stats = pstats.Stats(profile)
+            else:
+                stats.add(profile)
+        stats.dump_stats(os.path.join(self.out_dir, 'profile.pstats'))
+
+    def _write_tracemalloc(self):
+        snapshot = tracemalloc.take_snapshot().filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__),
+        ])
+        snapshot.dump(os.path.join(self.out_dir, 'tracemalloc.snapshot'))
+        with open(os.path.join(self.out_dir, 'tracemalloc.txt'), 'w') as out:
+            for stat in snapshot.statistics('lineno')[:25]:
+                out.write(f"{stat}\n")
@@ -0,0 +1,362 @@
+"""
+Streaming practice recorder.
+
+Captures an input stream (PyAudio, or a WAV file standing in for one) into a
+bounded, preallocated ring of blocks. A dedicated writer thread drains the ring
+to disk with the wave module, so memory stays constant however long the
+session runs. Metronome beats reported through mark_beat() are stored as WAV
+cue points (with "bar N beat M" labels) and streamed to a CSV sidecar file.
+
+The capture side only copies a block into the ring; when the ring is full the
+block is dropped and counted as an overrun rather than blocking, so recording
+can never stall the metronome's output stream.
+
+Sources report when the first frame of each block was captured (PortAudio's
+ADC timestamp for live input). Beats are shifted by the output stream's
+latency, so a marker lands where the click was heard, not where it was written.
+"""
+import csv
+import logging
+import os
+import queue
+import struct
+import threading
+import time
+import wave
+from dataclasses import dataclass
+
+import numpy
+import pyaudio
+
+DEFAULT_BLOCK_FRAMES = 1024
+DEFAULT_RING_BLOCKS = 64  # ~1.5 s of headroom at 44.1 kHz before overruns
+BEATS_PER_BAR = 4
+
+
+class BlockRing:
+    """Fixed-capacity ring of int16 audio blocks, allocated once up front."""
+
+    def __init__(self, capacity, block_samples):
+        self.capacity = capacity
+        self._blocks = numpy.zeros((capacity, block_samples), dtype=numpy.int16)
+        self._lengths = numpy.zeros(capacity, dtype=numpy.int64)
+        self._head = 0  # Next slot to fill
+        self._tail = 0  # Next slot to drain
+        self._count = 0
+        self._lock = threading.Lock()
+        self._ready = threading.Condition(self._lock)
+        self.overruns = 0
+
+    def __len__(self):
+        return self._count
+
+    def push(self, data):
+        """Copy a block of 16-bit samples into the ring; returns False (and counts an overrun) if full."""
+        samples = numpy.frombuffer(data, dtype=numpy.int16)
+        n = min(len(samples), self._blocks.shape[1])
+        with self._lock:
+            if self._count == self.capacity:
+                self.overruns += 1
+                return False
+            slot = self._head
+            self._blocks[slot, :n] = samples[:n]
+            self._lengths[slot] = n
+            self._head = (slot + 1) % self.capacity
+            self._count += 1
+            self._ready.notify()
+        return True
+
+    def peek(self, timeout=None):
+        """Wait for the oldest block and return a view of it, or None on timeout.
+
+        The slot stays reserved until release() is called.
+        """
+        with self._ready:
+            if not self._count:
+                self._ready.wait(timeout)
+                if not self._count:
+                    return None
+            slot = self._tail
+            return self._blocks[slot, :self._lengths[slot]]
+
+    def release(self):
+        with self._lock:
+            self._tail = (self._tail + 1) % self.capacity
+            self._count -= 1
+
+
+class PyAudioInputSource:
+    """Non-blocking PyAudio input stream that hands each captured block to the recorder."""
+
+    def __init__(self, pa, samplerate=44100, channels=1, block_frames=DEFAULT_BLOCK_FRAMES):
+        self.pa = pa
+        self.samplerate = samplerate
+        self.channels = channels
+        self.block_frames = block_frames
+        self.stream = None
+        self.input_overflows = 0
+        self._on_block = None
+        self._input_latency = 0.0
+
+    def start(self, on_block):
+        self._on_block = on_block
+        self.stream = self.pa.open(format=pyaudio.paInt16,
+                                   channels=self.channels,
+                                   rate=self.samplerate,
+                                   input=True,
+                                   frames_per_buffer=self.block_frames,
+                                   stream_callback=self._callback)
+        self._input_latency = self.stream.get_input_latency()
+
+    def _callback(self, in_data, frame_count, time_info, status):
+        # Runs on PortAudio's thread: keep it to a copy into the ring
+        if status & pyaudio.paInputOverflow:
+            self.input_overflows += 1
+        now = time.perf_counter()
+        adc_time = time_info.get('input_buffer_adc_time')
+        current_time = time_info.get('current_time')
+        if adc_time and current_time:
+            # ADC and current time share PortAudio's stream clock; map the offset onto perf_counter
+            captured_at = now - (current_time - adc_time)
+        else:
+            # Some host APIs report no timestamps: the block ended one input latency ago
+            captured_at = now - frame_count / self.samplerate - self._input_latency
+        self._on_block(in_data, captured_at)
+        return (None, pyaudio.paContinue)
+
+    def stop(self):
+        if self.stream:
+            self.stream.stop_stream()
+            self.stream.close()
+            self.stream = None
+
+
+class WavFileSource:
+    """Plays a WAV file into the recorder in blocks, standing in for a live input.
+
+    Frame N of the file counts as captured N / samplerate seconds after
+    start(), whether or not blocks are paced in real time.
+    """
+
+    def __init__(self, path, block_frames=DEFAULT_BLOCK_FRAMES, realtime=False):
+        self.path = path
+        self.block_frames = block_frames
+        self.realtime = realtime  # Pace blocks at the file's sample rate
+        with wave.open(path, 'rb') as wav:
+            if wav.getsampwidth() != 2:
+                raise ValueError(f"{path}: only 16-bit WAV files are supported")
+            self.samplerate = wav.getframerate()
+            self.channels = wav.getnchannels()
+        self.input_overflows = 0
+        self.started_at = None  # perf_counter time of the file's first frame
+        self.finished = threading.Event()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start(self, on_block):
+        self.started_at = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, args=(on_block,), daemon=True)
+        self._thread.start()
+
+    def _run(self, on_block):
+        block_seconds = self.block_frames / self.samplerate
+        next_time = self.started_at
+        with wave.open(self.path, 'rb') as wav:
+            while not self._stop_event.is_set():
+                data = wav.readframes(self.block_frames)
+                if not data:
+                    break
+                on_block(data, next_time)
+                next_time += block_seconds
+                if self.realtime:
+                    delay = next_time - time.perf_counter()
+                    if delay > 0:
+                        time.sleep(delay)
+        self.finished.set()
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout=1)
+
+
+@dataclass
+class RecordingStats:
+    path: str
+    sidecar_path: str
+    frames_written: int
+    samplerate: int
+    markers: int
+    overruns: int  # Blocks dropped because the writer fell behind
+    input_overflows: int  # Overflows reported by the input device
+
+    @property
+    def seconds(self):
+        return self.frames_written / self.samplerate if self.samplerate else 0.0
+
+
+class PracticeRecorder:
+    def __init__(self, path, ring_blocks=DEFAULT_RING_BLOCKS, beats_per_bar=BEATS_PER_BAR,
+                 sidecar=True, output_latency=0.0):
+        self.path = path
+        self.sidecar_path = os.path.splitext(path)[0] + '.markers.csv' if sidecar else None
+        self.ring_blocks = ring_blocks
+        self.beats_per_bar = beats_per_bar
+        self.output_latency = output_latency  # Seconds from writing a click to hearing it
+        self.source = None
+        self.ring = None
+        self._markers = queue.SimpleQueue()  # (beat_index, perf_counter time) from the metronome thread
+        self._cues = []  # (sample position, label) - small, one entry per beat
+        self._frames_accepted = 0
+        self._anchor = None  # (frame position, perf_counter capture time) of the latest block's first frame
+        self._last_beat = None  # Beat index of the previous marker, to spot a restarted metronome
+        self._beat_offset = 0  # Beats of earlier runs, so labels keep counting across restarts
+        self._stop_event = threading.Event()
+        self._writer_thread = None
+        self._frames_written = 0
+
+    @property
+    def is_recording(self):
+        return self._writer_thread is not None and self._writer_thread.is_alive()
+
+    def start(self, source):
+        self.source = source
+        self.ring = BlockRing(self.ring_blocks, source.block_frames * source.channels)
+        self._anchor = (0, time.perf_counter())
+        self._stop_event.clear()
+        # Open the input first so a failure leaves no empty files behind; blocks
+        # captured before the writer starts simply wait in the ring
+        source.start(self._on_block)
+        self._writer_thread = threading.Thread(target=self._write_loop, daemon=True)
+        self._writer_thread.start()
+        logging.info(f"Recording to {self.path}.")
+
+    def _on_block(self, data, captured_at=None):
+        # Capture side: never blocks, never allocates beyond the frombuffer view
+        frames = len(data) // (2 * self.source.channels)
+        if captured_at is None:
+            captured_at = time.perf_counter() - frames / self.source.samplerate
+        if self.ring.push(data):
+            self._anchor = (self._frames_accepted, captured_at)
+            self._frames_accepted += frames
+
+    def mark_beat(self, beat_index, when=None):
+        """Record that the metronome wrote beat `beat_index` at perf_counter time `when`."""
+        when = time.perf_counter() if when is None else when
+        self._markers.put((beat_index, when + self.output_latency))
+
+    def stop(self):
+        if self.source:
+            self.source.stop()
+        self._stop_event.set()
+        if self._writer_thread:
+            self._writer_thread.join()
+        _append_cue_chunks(self.path, self._cues)
+
+        stats = RecordingStats(path=self.path,
+                               sidecar_path=self.sidecar_path,
+                               frames_written=self._frames_written,
+                               samplerate=self.source.samplerate if self.source else 0,
+                               markers=len(self._cues),
+                               overruns=self.ring.overruns if self.ring is not None else 0,
+                               input_overflows=self.source.input_overflows if self.source else 0)
+        if stats.overruns or stats.input_overflows:
+            logging.warning(f"Recording had {stats.overruns} ring overruns and "
+                            f"{stats.input_overflows} input overflows; audio was dropped.")
+        logging.info(f"Recorded {stats.seconds:.1f}s with {stats.markers} beat markers to {self.path}.")
+        return stats
+
+    def _write_loop(self):
+        sidecar = open(self.sidecar_path, 'w', newline='') if self.sidecar_path else None
+        try:
+            writer = csv.writer(sidecar) if sidecar else None
+            if writer:
+                writer.writerow(['sample', 'seconds', 'bar', 'beat'])
+            with wave.open(self.path, 'wb') as wav:
+                wav.setnchannels(self.source.channels)
+                wav.setsampwidth(2)
+                wav.setframerate(self.source.samplerate)
+                while True:
+                    block = self.ring.peek(timeout=0.1)
+                    if block is not None:
+                        wav.writeframes(block)
+                        self._frames_written += len(block) // self.source.channels
+                        self.ring.release()
+                    self._drain_markers(writer)
+                    if block is None and self._stop_event.is_set() and not len(self.ring):
+                        break
+        finally:
+            if sidecar:
+                sidecar.close()
+
+    def _drain_markers(self, writer):
+        rate = self.source.samplerate
+        while True:
+            try:
+                beat_index, when = self._markers.get_nowait()
+            except queue.Empty:
+                return
+            if self._last_beat is not None and beat_index <= self._last_beat:
+                # The metronome was restarted: carry on from the next bar
+                previous = self._last_beat + self._beat_offset
+                self._beat_offset = (previous // self.beats_per_bar + 1) * self.beats_per_bar
+            self._last_beat = beat_index
+            beat_index += self._beat_offset
+            frames, anchor_time = self._anchor
+            position = max(0, int(round(frames + (when - anchor_time) * rate)))
+            bar = beat_index // self.beats_per_bar + 1
+            beat = beat_index % self.beats_per_bar + 1
+            self._cues.append((position, f"bar {bar} beat {beat}"))
+            if writer:
+                writer.writerow([position, f"{position / rate:.6f}", bar, beat])
+
+
+def _append_cue_chunks(path, cues):
+    """Append a RIFF 'cue ' chunk and matching 'LIST'/'adtl' labels to a closed WAV file."""
+    if not cues:
+        return
+    cue_chunk = struct.pack('<I', len(cues))
+    labels = b''
+    for cue_id, (position, label) in enumerate(cues, start=1):
+        cue_chunk += struct.pack('<II4sIII', cue_id, position, b'data', 0, 0, position)
+        text = label.encode('ascii') + b'\x00'
+        labl = struct.pack('<I', cue_id) + text
+        labels += b'labl' + struct.pack('<I', len(labl)) + labl + (b'\x00' if len(labl) % 2 else b'')
+    adtl = b'adtl' + labels
+    chunks = (b'cue ' + struct.pack('<I', len(cue_chunk)) + cue_chunk
+              + b'LIST' + struct.pack('<I', len(adtl)) + adtl)
+
+    with open(path, 'r+b') as wav_file:
+        wav_file.seek(0, os.SEEK_END)
+        if wav_file.tell() % 2:
+            wav_file.write(b'\x00')  # RIFF chunks are word-aligned
+        wav_file.write(chunks)
+        riff_size = wav_file.tell() - 8
+        wav_file.seek(4)
+        wav_file.write(struct.pack('<I', riff_size))
+
+
+def read_cue_points(path):
+    """Return [(sample position, label)] from a WAV file's cue/adtl chunks."""
+    with open(path, 'rb') as wav_file:
+        data = wav_file.read()
+    positions, labels = {}, {}
+    offset = 12
+    while offset + 8 <= len(data):
+        chunk_id, size = struct.unpack_from('<4sI', data, offset)
+        body = offset + 8
+        if chunk_id == b'cue ':
+            (count,) = struct.unpack_from('<I', data, body)
+            for i in range(count):
+                cue_id, _, _, _, _, position = struct.unpack_from('<II4sIII', data, body + 4 + 24 * i)
+                positions[cue_id] = position
+        elif chunk_id == b'LIST' and data[body:body + 4] == b'adtl':
+            sub = body + 4
+            while sub + 8 <= body + size:
+                sub_id, sub_size = struct.unpack_from('<4sI', data, sub)
+                if sub_id == b'labl':
+                    (cue_id,) = struct.unpack_from('<I', data, sub + 8)
+                    labels[cue_id] = data[sub + 12:sub + 8 + sub_size].rstrip(b'\x00').decode('ascii')
+                sub += 8 + sub_size + (sub_size % 2)
+        offset = body + size + (size % 2)
+    return [(positions[cue_id], labels.get(cue_id, '')) for cue_id in sorted(positions)]
@@ -0,0 +1,484 @@
+"""
+Soak harness for long-running metronome sessions.
+
+Runs MetronomeApp's playback loop against a null audio backend on a simulated
+clock, so millions of beats play in minutes instead of days. While it runs,
+BPM changes, window resizes and start/stop cycles are injected at random and
+memory (RSS and tracemalloc), canvas items, pending after() callbacks and beat
+timing are sampled. The run fails if anything grows past its threshold.
+
+Simulated time is not free: a write takes as long as the audio it plays and
+every sleep loses a small fixed overhead, so drift the loop does not make up
+for accumulates as it would on a real machine.
+
+Usage:
+    python soak.py --beats 2000000 --seed 7 --json soak_report.json
+
+Tk needs a display; on a headless machine run it under ``xvfb-run``.
+"""
+import argparse
+import heapq
+import itertools
+import json
+import logging
+import os
+import random
+import sys
+import threading
+import time
+import tracemalloc
+from dataclasses import dataclass, field, asdict
+from types import SimpleNamespace
+from unittest import mock
+
+import tkinter as tk
+
+import main as metronome
+
+DEFAULT_BEATS = 1_000_000
+DEFAULT_CHECKPOINTS = 20
+CHAOS_INTERVAL = (0.5, 30.0)  # Simulated seconds between injected events
+MAX_IDLE = 5.0  # Longest simulated pause between a stop and the next start
+CHECKPOINT_GEOMETRY = (400, 450)  # Window size the canvas is redrawn at before counting items
+DEFAULT_BEAT_OVERHEAD = 0.0002  # Seconds lost after each sleep: timer wakeup plus the loop's bookkeeping
+MIB = 1024 * 1024
+
+
+class SimulatedClock:
+    """Stand-in for the time module: sleeping advances a virtual clock instantly.
+
+    Callbacks scheduled with call_later() fire in order while the clock
+    advances, which lets the harness play the part of the Tk event loop.
+    Every sleep also costs `beat_overhead`, the time a real thread loses
+    waking up and running the work that follows the sleep.
+    """
+
+    def __init__(self, sleep_jitter=0.0, rng=None, epoch=1_000_000.0, beat_overhead=0.0):
+        self.now = 0.0
+        self.epoch = epoch
+        self.sleep_jitter = sleep_jitter  # Max random oversleep, mimics OS timer slop
+        self.beat_overhead = beat_overhead
+        self.rng = rng or random.Random()
+        self._queue = []
+        self._live = set()
+        self._ids = itertools.count(1)
+
+    def perf_counter(self):
+        return self.now
+
+    def time(self):
+        return self.epoch + self.now
+
+    def sleep(self, seconds):
+        seconds += self.beat_overhead
+        if self.sleep_jitter:
+            seconds += self.rng.uniform(0, self.sleep_jitter)
+        self.advance(seconds)
+
+    def advance(self, seconds):
+        target = self.now + max(seconds, 0.0)
+        while self._queue and self._queue[0][0] <= target:
+            due, job_id, func, args = heapq.heappop(self._queue)
+            if job_id not in self._live:
+                continue  # Cancelled
+            self._live.discard(job_id)
+            self.now = max(self.now, due)
+            func(*args)
+        self.now = target
+
+    def call_later(self, delay, func, *args):
+        job_id = next(self._ids)
+        heapq.heappush(self._queue, (self.now + delay, job_id, func, args))
+        self._live.add(job_id)
+        return job_id
+
+    def cancel(self, job_id):
+        self._live.discard(job_id)
+
+    @property
+    def pending(self):
+        return len(self._live)
+
+
+class NullStream:
+    """Output stream that discards audio and reports each write.
+
+    With a clock, write() blocks for the duration of the audio it is given,
+    like a blocking PortAudio stream whose buffer is full.
+    """
+
+    def __init__(self, on_write=None, clock=None, rate=44100):
+        self.on_write = on_write
+        self.clock = clock
+        self.rate = rate
+        self.frames_written = 0
+        self.active = True
+
+    def is_active(self):
+        return self.active
+
+    def write(self, data):
+        frames = len(data) // 2  # 16-bit mono
+        self.frames_written += frames
+        if self.on_write:
+            self.on_write(data)  # Called as the write starts, i.e. at the click's onset
+        if self.clock:
+            self.clock.advance(frames / self.rate)
+
+    def stop_stream(self):
+        self.active = False
+
+    def close(self):
+        self.active = False
+
+
+class NullPyAudio:
+    """Drop-in for the pyaudio module; also serves as its own PyAudio() instance."""
+
+    paInt16 = 8
+    PyAudioError = OSError
+
+    def __init__(self, clock=None):
+        self.clock = clock
+        self.streams = []
+
+    def PyAudio(self):
+        return self
+
+    def open(self, rate=44100, **kwargs):
+        stream = NullStream(clock=self.clock, rate=rate)
+        self.streams.append(stream)
+        return stream
+
+    def terminate(self):
+        for stream in self.streams:
+            stream.close()
+
+
+class InlineThread:
+    """threading.Thread stand-in whose target is run by the harness on its own thread."""
+
+    def __init__(self, target=None, daemon=None):
+        self.target = target
+        self.daemon = daemon
+        self.running = False
+
+    def start(self):
+        pass  # The harness calls run() itself
+
+    def run(self):
+        self.running = True
+        try:
+            self.target()
+        finally:
+            self.running = False
+
+    def is_alive(self):
+        return self.running
+
+    def join(self, timeout=None):
+        pass
+
+
+class SimulatedRoot:
+    """Wraps the Tk root so after() callbacks fire on the simulated clock."""
+
+    def __init__(self, root, clock):
+        self._root = root
+        self._clock = clock
+
+    def after(self, ms, func, *args):
+        return self._clock.call_later(ms / 1000.0, func, *args)
+
+    def after_cancel(self, job_id):
+        self._clock.cancel(job_id)
+
+    def __getattr__(self, name):
+        return getattr(self._root, name)
+
+
+def current_rss():
+    """Resident set size in bytes, or None where it cannot be read."""
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None
+    # Peak rather than current RSS; kilobytes on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+@dataclass
+class Checkpoint:
+    beats: int
+    simulated_seconds: float
+    rss_bytes: int = None
+    traced_bytes: int = None
+    canvas_items: int = 0
+    pending_callbacks: int = 0
+
+
+@dataclass
+class SoakReport:
+    beats: int = 0
+    runs: int = 0
+    bpm_changes: int = 0
+    resizes: int = 0
+    simulated_seconds: float = 0.0
+    wall_seconds: float = 0.0
+    max_abs_error: float = 0.0  # Worst distance of a beat from its ideal time
+    total_abs_error: float = 0.0
+    checkpoints: list = field(default_factory=list)
+    top_allocations: list = field(default_factory=list)
+    failures: list = field(default_factory=list)
+
+    @property
+    def passed(self):
+        return not self.failures
+
+    @property
+    def mean_abs_error(self):
+        return self.total_abs_error / self.beats if self.beats else 0.0
+
+    def growth(self, name):
+        """Change in a checkpoint metric from the post-warmup baseline to the end."""
+        if len(self.checkpoints) < 2:
+            return None
+        first = getattr(self.checkpoints[0], name)
+        last = getattr(self.checkpoints[-1], name)
+        if first is None or last is None:
+            return None
+        return last - first
+
+    def to_dict(self):
+        data = asdict(self)
+        data['passed'] = self.passed
+        data['mean_abs_error'] = self.mean_abs_error
+        return data
+
+    def summary(self):
+        def mib(value):
+            return "n/a" if value is None else f"{value / MIB:+.2f} MiB"
+
+        def count(value):
+            return "n/a" if value is None else f"{value:+d}"
+
+        lines = [
+            f"Soak run: {'PASSED' if self.passed else 'FAILED'}",
+            f"  beats             {self.beats:,} over {self.runs} start/stop runs",
+            f"  simulated time    {self.simulated_seconds / 3600:.1f} h (wall {self.wall_seconds:.1f} s)",
+            f"  bpm changes       {self.bpm_changes:,}",
+            f"  canvas resizes    {self.resizes:,}",
+            f"  timing error      max {self.max_abs_error * 1000:.3f} ms, mean {self.mean_abs_error * 1000:.3f} ms",
+            f"  rss growth        {mib(self.growth('rss_bytes'))}",
+            f"  traced growth     {mib(self.growth('traced_bytes'))}",
+            f"  canvas items      {count(self.growth('canvas_items'))}",
+            f"  pending callbacks {count(self.growth('pending_callbacks'))}",
+        ]
+        if self.top_allocations:
+            lines.append("  top allocation growth:")
+            lines.extend(f"    {entry}" for entry in self.top_allocations)
+        for failure in self.failures:
+            lines.append(f"  FAIL: {failure}")
+        return "\n".join(lines)
+
+
+class SoakHarness:
+    def __init__(self, beats=DEFAULT_BEATS, seed=0, sleep_jitter=0.0,
+                 beat_overhead=DEFAULT_BEAT_OVERHEAD, checkpoints=DEFAULT_CHECKPOINTS, use_tracemalloc=True,
+                 max_rss_growth=16 * MIB, max_traced_growth=1 * MIB,
+                 max_canvas_growth=0, max_callback_growth=0, max_error=0.001,
+                 root=None, quiet=True):
+        self.beats = beats
+        self.rng = random.Random(seed)
+        self.clock = SimulatedClock(sleep_jitter, random.Random(seed + 1), beat_overhead=beat_overhead)
+        self.backend = NullPyAudio(self.clock)
+        self.checkpoint_every = max(1, beats // max(1, checkpoints))
+        self.use_tracemalloc = use_tracemalloc
+        self.max_rss_growth = max_rss_growth
+        self.max_traced_growth = max_traced_growth
+        self.max_canvas_growth = max_canvas_growth
+        self.max_callback_growth = max_callback_growth
+        self.max_error = max_error
+        self.root = root
+        self.quiet = quiet
+        self.app = None
+        self.report = SoakReport()
+        self._expected = None  # Ideal time of the next beat in the current run
+        self._baseline_snapshot = None
+
+    def run(self):
+        owns_root = self.root is None
+        root = tk.Tk() if owns_root else self.root
+        if owns_root:
+            root.withdraw()
+        logger = logging.getLogger()
+        previous_level = logger.level
+        if self.quiet:
+            logger.setLevel(logging.WARNING)
+        if self.use_tracemalloc:
+            tracemalloc.start()
+        wall_start = time.perf_counter()
+        fake_threading = SimpleNamespace(Thread=InlineThread, Event=threading.Event)
+        try:
+            with mock.patch.object(metronome, 'pyaudio', self.backend), \
+                 mock.patch.object(metronome, 'time', self.clock), \
+                 mock.patch.object(metronome, 'threading', fake_threading):
+                self.app = metronome.MetronomeApp(root)
+                self.app.root = SimulatedRoot(root, self.clock)
+                self.app.stream.on_write = self._on_beat
+                self._resize()
+                self.clock.call_later(self.rng.uniform(*CHAOS_INTERVAL), self._chaos)
+
+                while self.report.beats < self.beats:
+                    self._expected = None
+                    self.app.start_metronome()
+                    self.report.runs += 1
+                    self.app.metronome_thread.run()
+                    if self.report.beats < self.beats:
+                        self.clock.advance(self.rng.uniform(0, MAX_IDLE))
+
+                if self.report.beats % self.checkpoint_every:
+                    self._checkpoint()
+                self._collect_top_allocations()
+                self.app.stop_metronome()
+        finally:
+            self.report.simulated_seconds = self.clock.now
+            self.report.wall_seconds = time.perf_counter() - wall_start
+            if self.use_tracemalloc:
+                tracemalloc.stop()
+            logger.setLevel(previous_level)
+            self.backend.terminate()
+            if owns_root:
+                root.destroy()
+
+        self._evaluate()
+        return self.report
+
+    def _on_beat(self, data):
+        now = self.clock.now
+        if self._expected is None:
+            self._expected = now  # First beat of a run sets the grid
+        error = abs(now - self._expected)
+        self.report.total_abs_error += error
+        if error > self.report.max_abs_error:
+            self.report.max_abs_error = error
+        # The loop read the BPM just before writing, so it governs this interval
+        self._expected += 60.0 / self.app.bpm.get()
+
+        self.report.beats += 1
+        if self.report.beats % self.checkpoint_every == 0:
+            self._checkpoint()
+        if self.report.beats >= self.beats:
+            self.app.stop_metronome()
+
+    def _chaos(self):
+        roll = self.rng.random()
+        if roll < 0.6:
+            self.app.set_bpm(self.rng.randint(30, 300))
+            self.report.bpm_changes += 1
+        elif roll < 0.85:
+            self._resize()
+        elif self.app.is_playing:
+            self.app.stop_metronome()
+        self.clock.call_later(self.rng.uniform(*CHAOS_INTERVAL), self._chaos)
+
+    def _resize(self):
+        event = SimpleNamespace(width=self.rng.randint(300, 1600),
+                                height=self.rng.randint(300, 1200))
+        self.app._on_canvas_configure(event)
+        self.report.resizes += 1
+
+    def _checkpoint(self):
+        # The gradient's item count depends on the window height, so count at a fixed size
+        width, height = CHECKPOINT_GEOMETRY
+        self.app._on_canvas_configure(SimpleNamespace(width=width, height=height))
+        traced = None
+        if self.use_tracemalloc:
+            traced = tracemalloc.get_traced_memory()[0]
+            if self._baseline_snapshot is None:
+                self._baseline_snapshot = self._snapshot()
+        self.report.checkpoints.append(Checkpoint(
+            beats=self.report.beats,
+            simulated_seconds=self.clock.now,
+            rss_bytes=current_rss(),
+            traced_bytes=traced,
+            canvas_items=len(self.app.canvas.find_all()),
+            pending_callbacks=self.clock.pending,
+        ))
+
+    def _snapshot(self):
+        return tracemalloc.take_snapshot().filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__),
+        ])
+
+    def _collect_top_allocations(self, limit=10):
+        if self._baseline_snapshot is None:
+            return
+        stats = self._snapshot().compare_to(self._baseline_snapshot, 'lineno')
+        self.report.top_allocations = [str(stat) for stat in stats[:limit] if stat.size_diff > 0]
+
+    def _evaluate(self):
+        report = self.report
+        limits = [
+            ('rss_bytes', self.max_rss_growth, "RSS"),
+            ('traced_bytes', self.max_traced_growth, "traced memory"),
+            ('canvas_items', self.max_canvas_growth, "canvas items"),
+            ('pending_callbacks', self.max_callback_growth, "pending after() callbacks"),
+        ]
+        for name, limit, label in limits:
+            growth = report.growth(name)
+            if growth is not None and limit is not None and growth > limit:
+                report.failures.append(f"{label} grew by {growth:,} (limit {limit:,})")
+        if self.max_error is not None and report.max_abs_error > self.max_error:
+            report.failures.append(
+                f"beat timing drifted {report.max_abs_error * 1000:.3f} ms "
+                f"from the ideal grid (limit {self.max_error * 1000:.3f} ms)")
+
+
+def run_cli(argv=None):
+    parser = argparse.ArgumentParser(description="Soak-test the metronome engine on a simulated clock.")
+    parser.add_argument('--beats', type=int, default=DEFAULT_BEATS, help="Total beats to play")
+    parser.add_argument('--seed', type=int, default=0, help="Random seed for injected events")
+    parser.add_argument('--sleep-jitter', type=float, default=0.0,
+                        help="Max random oversleep per beat in seconds, to model OS timer slop")
+    parser.add_argument('--beat-overhead', type=float, default=DEFAULT_BEAT_OVERHEAD,
+                        help="Seconds lost after every sleep (wakeup and bookkeeping); 0 for an ideal timer")
+    parser.add_argument('--checkpoints', type=int, default=DEFAULT_CHECKPOINTS,
+                        help="Number of memory/canvas samples taken over the run")
+    parser.add_argument('--no-tracemalloc', action='store_true', help="Skip tracemalloc (faster)")
+    parser.add_argument('--max-rss-growth-mib', type=float, default=16.0)
+    parser.add_argument('--max-traced-growth-mib', type=float, default=1.0)
+    parser.add_argument('--max-canvas-growth', type=int, default=0)
+    parser.add_argument('--max-error-ms', type=float, default=1.0,
+                        help="Largest allowed distance of a beat from its ideal time")
+    parser.add_argument('--json', metavar='PATH', help="Also write the report as JSON")
+    args = parser.parse_args(argv)
+
+    harness = SoakHarness(
+        beats=args.beats,
+        seed=args.seed,
+        sleep_jitter=args.sleep_jitter,
+        beat_overhead=args.beat_overhead,
+        checkpoints=args.checkpoints,
+        use_tracemalloc=not args.no_tracemalloc,
+        max_rss_growth=int(args.max_rss_growth_mib * MIB),
+        max_traced_growth=int(args.max_traced_growth_mib * MIB),
+        max_canvas_growth=args.max_canvas_growth,
+        max_error=args.max_error_ms / 1000.0,
+    )
+    report = harness.run()
+    print(report.summary())
+    if args.json:
+        with open(args.json, 'w') as report_file:
+            json.dump(report.to_dict(), report_file, indent=2)
+    return 0 if report.passed else 1
+
+
+if __name__ == "__main__":
+    sys.exit(run_cli())
@@ -0,0 +1,17 @@
+"""
+Click synthesis shared by the metronome GUI and the multi-instance mixer.
+"""
+import numpy
+
+SAMPLERATE = 44100
+
+
+def synthesize_click(bpm_val, samplerate=SAMPLERATE):
+    """Float click for `bpm_val`: a decaying 440 Hz tone, 10% of the beat long (at most 50 ms)."""
+    frequency = 440  # Hz (Higher frequency for a sharper sound)
+    click_duration = min((60.0 / bpm_val) * 0.1, 0.05)  # seconds
+    t = numpy.linspace(0, click_duration, int(click_duration * samplerate), False)
+    amplitude = 0.5
+    wave_data = amplitude * numpy.sin(frequency * t * 2 * numpy.pi)
+    decay_envelope = numpy.exp(-numpy.linspace(0, 5, len(wave_data)))  # Exponential decay
+    return wave_data * decay_envelope
@@ -6,6 +6,7 @@ import tempfile
 import shutil
 import threading
 import time
+import numpy  # Import before patching sys.modules: numpy cannot be re-imported once evicted
 
 # Defer importing the application until after we patch modules (tkinter, pyaudio, threading)
 
@@ -274,6 +275,56 @@ class TestMetronomeApp(unittest.TestCase):
         self.app._play_metronome()
         self.assertEqual(self.app.beat_count_var.get(), 1)
 
+    def test_beat_listeners_notified(self):
+        # Listeners (e.g. the practice recorder) hear about each click after it is written
+        self.app.stream = mock.MagicMock()
+        self.app.stream.is_active.return_value = True
+        listener = mock.MagicMock()
+        self.app.beat_listeners = [listener]
+        self.app.audio_data = b'\x00\x00'
+        self.app.beat_count_var = mock.MagicMock()
+        self.app.beat_count_var.get.return_value = 7
+        self.app.stop_event.is_set.side_effect = [False, False, True]
+        self.app.bpm.set(300)
+        with mock.patch.object(_main.time, 'sleep'):
+            self.app._play_metronome()
+        self.app.stream.write.assert_called_once_with(b'\x00\x00')
+        listener.assert_called_once_with(7, mock.ANY)
+
+    def test_failing_beat_listener_does_not_stop_playback(self):
+        self.app.stream = mock.MagicMock()
+        self.app.stream.is_active.return_value = True
+        failing = mock.MagicMock(side_effect=RuntimeError("boom"))
+        listener = mock.MagicMock()
+        self.app.beat_listeners = [failing, listener]
+        self.app.audio_data = b'\x00\x00'
+        self.app.beat_count_var = mock.MagicMock()
+        self.app.beat_count_var.get.return_value = 0
+        self.app.stop_event.is_set.side_effect = [False, False, True]
+        self.app.bpm.set(300)
+        with mock.patch.object(_main.time, 'sleep'), \
+             mock.patch.object(_main.logging, 'error') as log_error:
+            self.app._play_metronome()
+        listener.assert_called_once()
+        self.assertIn("beat listener", log_error.call_args[0][0])
+
+    def test_toggle_recording_without_audio(self):
+        self.app.p = None
+        self.app.record_button = mock.MagicMock()
+        self.app.toggle_recording()
+        self.assertIsNone(self.app.recorder)
+        self.app.record_button.config.assert_not_called()
+
+    def test_toggle_recording_passes_output_latency(self):
+        self.app.p = mock.MagicMock()
+        self.app.stream = mock.MagicMock()
+        self.app.stream.get_output_latency.return_value = 0.02
+        self.app.record_button = mock.MagicMock()
+        with mock.patch.object(_main, 'PracticeRecorder') as recorder_cls:
+            self.app.toggle_recording()
+        self.assertEqual(recorder_cls.call_args.kwargs['output_latency'], 0.02)
+        self.assertIn(recorder_cls.return_value.mark_beat, self.app.beat_listeners)
+
     def test_audio_error_handling(self):
         # Test audio error handling in load_sound
         self.app.p = None  # Reset PyAudio instance
@@ -292,10 +343,15 @@ class TestMetronomeApp(unittest.TestCase):
         self.app.is_playing = False
         self.app.start_button = mock.MagicMock()  # Create fresh mock for start button
         self.app.stop_button = mock.MagicMock()   # Create fresh mock for stop button
-        self.app.start_metronome()
+        self.app.beat_count_var.set(87)  # Left over from a previous run
+        counts_at_thread_start = []
+        record_count = lambda: counts_at_thread_start.append(self.app.beat_count_var.get())
+        with mock.patch.object(_main.threading.Thread.return_value, 'start', side_effect=record_count):
+            self.app.start_metronome()
+        self.assertEqual(counts_at_thread_start, [0])  # Reset before the thread runs
         self.assertTrue(self.app.is_playing)
         self.app.stop_event.clear.assert_called_once()
-        self.app.metronome_thread.start.assert_called_once()
+        self.assertEqual(len(counts_at_thread_start), 1)
         self.app.start_button.config.assert_called_with(state='disabled')
         self.app.stop_button.config.assert_called_with(state='normal')
         self.assertEqual(self.app.beat_count_var.get(), 0)
@@ -329,5 +385,18 @@ class TestMetronomeApp(unittest.TestCase):
         self.app.p.terminate.assert_called_once()
         self.mock_root.destroy.assert_called_once()
 
+    def test_on_closing_stops_profiler(self):
+        self.app.profiler = mock.MagicMock()
+        self.app.profiler.running = True
+        self.app.on_closing()
+        self.app.profiler.stop.assert_called_once_with(handoff_timeout=0)
+
+    def test_parse_args_profile(self):
+        args = _main.parse_args(['--profile', '30', '--cprofile'])
+        self.assertEqual(args.profile, 30.0)
+        self.assertTrue(args.cprofile)
+        self.assertFalse(args.tracemalloc)
+        self.assertIsNone(_main.parse_args([]).profile)
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,181 @@
+import argparse
+import threading
+import unittest
+from unittest import mock
+
+import numpy
+
+# Mock pyaudio before importing the mixer (PortAudio may not be installed)
+mock_pyaudio = mock.MagicMock()
+
+with mock.patch.dict('sys.modules', {'pyaudio': mock_pyaudio}):
+    import mixer
+
+RATE = 1000  # Low sample rate keeps onsets easy to reason about
+
+
+def onsets(samples):
+    """Frames where a click starts (signal rises from silence)."""
+    nonzero = numpy.abs(samples) > 0
+    return list(numpy.flatnonzero(nonzero & ~numpy.concatenate(([False], nonzero[:-1]))))
+
+
+class ReleaseHookLock:
+    # Lock that runs `hook` once, just after its next release
+    def __init__(self, hook):
+        self._lock = threading.Lock()
+        self.hook = hook
+
+    def __enter__(self):
+        self._lock.acquire()
+
+    def __exit__(self, *exc_info):
+        self._lock.release()
+        hook, self.hook = self.hook, None
+        if hook:
+            hook()
+
+
+class TestClickMixer(unittest.TestCase):
+    def setUp(self):
+        # A short rectangular click makes onsets unambiguous
+        self.click_patcher = mock.patch.object(mixer, 'synthesize_click',
+                                               return_value=numpy.full(20, 0.5))
+        self.click_patcher.start()
+
+    def tearDown(self):
+        self.click_patcher.stop()
+
+    def test_click_matches_engine_tempo(self):
+        mix = mixer.ClickMixer(channels=1, samplerate=RATE)
+        engine = mix.add(mixer.ClickEngine(bpm=120))
+        mix.start(engine)
+        out = numpy.concatenate([mix.render(250) for _ in range(8)])  # Clicks span block edges
+        self.assertEqual(out.shape, (2000, 1))
+        self.assertEqual(out.dtype, numpy.int16)
+        self.assertEqual(onsets(out[:, 0]), [0, 500, 1000, 1500])
+        self.assertEqual(engine.beats_played, 4)
+
+    def test_independent_tempos_and_patterns(self):
+        mix = mixer.ClickMixer(channels=2, samplerate=RATE)
+        left = mix.add(mixer.ClickEngine(bpm=60, pattern=[1.0, 0.5], pan=-1))
+        right = mix.add(mixer.ClickEngine(bpm=90, pan=1))
+        mix.start(left)
+        mix.start(right, delay=0.25)
+        out = mix.render(3000)
+        self.assertEqual(onsets(out[:, 0]), [0, 1000, 2000])
+        self.assertEqual(onsets(out[:, 1]), [250, 917, 1583, 2250, 2917])
+        # Accent pattern: the second beat is at half gain
+        self.assertAlmostEqual(out[1000, 0] / out[0, 0], 0.5, places=3)
+        self.assertEqual(out[0, 1], 0)  # Hard left
+
+    def test_constant_power_pan_and_channel_routing(self):
+        centre = mixer.ClickEngine(gain=1.0, pan=0.0).channel_gains(2)
+        numpy.testing.assert_allclose(centre, [numpy.sqrt(0.5)] * 2, rtol=1e-6)
+        routed = mixer.ClickEngine(gain=0.5, channel=2).channel_gains(4)
+        numpy.testing.assert_allclose(routed, [0, 0, 0.5, 0])
+        with self.assertRaises(ValueError):
+            mixer.ClickMixer(channels=2).add(mixer.ClickEngine(channel=3))
+
+    def test_stop_and_restart(self):
+        mix = mixer.ClickMixer(channels=1, samplerate=RATE)
+        engine = mix.add(mixer.ClickEngine(bpm=120))
+        mix.start(engine)
+        mix.render(600)
+        mix.stop(engine)
+        self.assertEqual(onsets(mix.render(1000)[:, 0]), [])
+        mix.start(engine, delay=0.1)
+        self.assertEqual(onsets(mix.render(1000)[:, 0]), [100, 600])
+
+    def test_start_during_render_schedules_in_a_later_block(self):
+        mix = mixer.ClickMixer(channels=1, samplerate=RATE)
+        late = mix.add(mixer.ClickEngine(bpm=300))
+        mix.render(100)
+        # Another thread starts an engine once render() has scheduled this block's onsets
+        mix._lock = ReleaseHookLock(lambda: mix.start(late))
+        self.assertEqual(onsets(mix.render(100)[:, 0]), [])
+        self.assertEqual(onsets(mix.render(100)[:, 0]), [0])
+
+    def test_idle_engines_are_not_visited(self):
+        mix = mixer.ClickMixer(channels=1, samplerate=RATE)
+        engines = [mix.add(mixer.ClickEngine(bpm=30)) for _ in range(200)]
+        for i, engine in enumerate(engines):
+            mix.start(engine, delay=i * 0.01)
+        mix.render(15)  # Only the first two onsets fall in this block
+        self.assertEqual(sum(engine.beats_played for engine in engines), 2)
+        self.assertEqual(mix.active_clicks, 2)
+
+    def test_clipping(self):
+        mix = mixer.ClickMixer(channels=1, samplerate=RATE)
+        for _ in range(10):
+            mix.start(mix.add(mixer.ClickEngine(bpm=60, gain=1.0)))
+        out = mix.render(100)
+        self.assertLessEqual(out.max(), 32767)
+        self.assertGreaterEqual(out.min(), -32767)
+
+
+class TestMixerPlayer(unittest.TestCase):
+    def tearDown(self):
+        mock_pyaudio.reset_mock(return_value=True, side_effect=True)
+
+    def test_write_error_ends_cli(self):
+        stream = mock_pyaudio.PyAudio.return_value.open.return_value
+        stream.write.side_effect = OSError("device unplugged")
+        cli = threading.Thread(target=mixer.run_cli, args=(['--click', '120'],), daemon=True)
+        cli.start()
+        cli.join(timeout=3)
+        self.assertFalse(cli.is_alive())
+        stream.close.assert_called_once()
+        mock_pyaudio.PyAudio.return_value.terminate.assert_called_once()
+
+    def test_render_error_ends_cli(self):
+        with mock.patch.object(mixer.ClickMixer, 'render', side_effect=ValueError("bad block")):
+            cli = threading.Thread(target=mixer.run_cli, args=(['--click', '120'],), daemon=True)
+            cli.start()
+            cli.join(timeout=3)
+        self.assertFalse(cli.is_alive())
+        mock_pyaudio.PyAudio.return_value.terminate.assert_called_once()
+
+    def test_failed_open_terminates_pyaudio(self):
+        mock_pyaudio.PyAudio.return_value.open.side_effect = OSError("invalid number of channels")
+        player = mixer.MixerPlayer(mixer.ClickMixer(channels=8))
+        with self.assertRaises(OSError):
+            player.start()
+        mock_pyaudio.PyAudio.return_value.terminate.assert_called_once()
+        self.assertIsNone(player.p)
+        self.assertIsNone(player.thread)
+
+    def test_cli_rejects_channel_beyond_output(self):
+        with mock.patch('sys.stderr') as stderr, self.assertRaises(SystemExit):
+            mixer.run_cli(['--channels', '4', '--click', '120:4:1:ch5'])
+        self.assertIn("Output channel 5", ''.join(call.args[0] for call in stderr.write.call_args_list))
+
+    def test_cli_rejects_channels_below_one(self):
+        with mock.patch('sys.stderr'), self.assertRaises(SystemExit):
+            mixer.run_cli(['--channels', '0', '--click', '120'])
+        mock_pyaudio.PyAudio.assert_not_called()
+
+
+class TestParseClick(unittest.TestCase):
+    def test_full_spec(self):
+        engine = mixer.parse_click('120:3:0.8:-0.5')
+        self.assertEqual(engine.bpm, 120)
+        self.assertEqual(engine.pattern, [mixer.ACCENT, mixer.OFFBEAT, mixer.OFFBEAT])
+        self.assertEqual(engine.gain, 0.8)
+        self.assertEqual(engine.pan, -0.5)
+        self.assertIsNone(engine.channel)
+
+    def test_channel_and_bpm_limits(self):
+        engine = mixer.parse_click('500:4:1:ch3')
+        self.assertEqual(engine.bpm, 300)
+        self.assertEqual(engine.channel, 2)  # chN counts from 1
+        with self.assertRaises(argparse.ArgumentTypeError):
+            mixer.parse_click('120:4:1:ch0')
+
+    def test_invalid_spec(self):
+        with self.assertRaises(argparse.ArgumentTypeError):
+            mixer.parse_click('fast')
+
+
+if __name__ == '__main__':
+    unittest.main()
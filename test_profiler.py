@@ -0,0 +1,203 @@
+import os
+import pstats
+import queue
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+import profiler
+
+
+def busy_work(seconds):
+    end = time.perf_counter() + seconds
+    total = 0
+    while time.perf_counter() < end:
+        total += sum(range(1000))
+    return total
+
+
+class FakeTkRoot:
+    # Event loop that, like threaded Tcl, runs other threads' calls on its own thread
+    def __init__(self):
+        self.calls = queue.Queue()
+        self.timers = []
+
+    def after(self, ms, func, *args):
+        self.timers.append((time.perf_counter() + ms / 1000.0, func, args))
+
+    def call(self, func):
+        # What tkinter does for IntVar.get() from a non-Tk thread: queue it and wait
+        done = threading.Event()
+        result = []
+        self.calls.put((func, result, done))
+        done.wait()
+        return result[0]
+
+    def run_until(self, predicate, timeout):
+        end = time.perf_counter() + timeout
+        while not predicate() and time.perf_counter() < end:
+            try:
+                func, result, done = self.calls.get(timeout=0.005)
+                result.append(func())
+                done.set()
+            except queue.Empty:
+                pass
+            now = time.perf_counter()
+            for timer in [timer for timer in self.timers if timer[0] <= now]:
+                self.timers.remove(timer)
+                timer[1](*timer[2])
+
+
+class TestSessionProfiler(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.out_dir = os.path.join(self.test_dir, 'profile')
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def run_session(self, **kwargs):
+        app = SimpleNamespace(_play_metronome=lambda: busy_work(0.2), beat_listeners=[])
+        session = profiler.SessionProfiler(1, out_dir=self.out_dir, interval=0.002, **kwargs)
+        session.attach(app)
+        session.start()
+        audio_thread = threading.Thread(target=app._play_metronome)
+        audio_thread.start()
+        busy_work(0.1)
+        audio_thread.join()
+        session.stop()
+        return app, session
+
+    def test_attach_wraps_audio_target(self):
+        app, session = self.run_session()
+        self.assertIs(app.profiler, session)
+        self.assertFalse(session.running)
+
+    def test_writes_collapsed_stacks_and_summary(self):
+        self.run_session()
+        with open(os.path.join(self.out_dir, 'stacks.collapsed')) as collapsed:
+            lines = collapsed.read().splitlines()
+        self.assertTrue(lines)
+        threads = {line.split(';', 1)[0] for line in lines}
+        self.assertEqual(threads, {'tk', 'audio'})
+        for line in lines:
+            stack, count = line.rsplit(' ', 1)
+            self.assertGreater(int(count), 0)
+        self.assertTrue(any('busy_work' in line for line in lines))
+
+        with open(os.path.join(self.out_dir, 'summary.txt')) as summary:
+            text = summary.read()
+        self.assertIn("CPU time per thread:", text)
+        self.assertIn("audio", text)
+        self.assertIn("Hottest frames in 'tk'", text)
+        self.assertFalse(os.path.exists(os.path.join(self.out_dir, 'profile.pstats')))
+
+    def test_optional_cprofile_and_tracemalloc(self):
+        self.run_session(use_cprofile=True, use_tracemalloc=True)
+        stats = pstats.Stats(os.path.join(self.out_dir, 'profile.pstats'))
+        self.assertTrue(any(func[2] == 'busy_work' for func in stats.stats))
+        self.assertTrue(os.path.exists(os.path.join(self.out_dir, 'tracemalloc.snapshot')))
+        self.assertTrue(os.path.exists(os.path.join(self.out_dir, 'tracemalloc.txt')))
+
+    def test_running_thread_drops_cprofile_when_profiling_stops(self):
+        session = profiler.SessionProfiler(1, out_dir=self.out_dir, interval=0.002, use_cprofile=True)
+        done = threading.Event()
+        profile_after_stop = []
+
+        def play():
+            # Mimics the metronome loop: work, then notify beat listeners
+            while not done.is_set():
+                busy_work(0.005)
+                for listener in app.beat_listeners:
+                    listener(0, time.perf_counter())
+                if not session.running:
+                    profile_after_stop.append(sys.getprofile())
+
+        app = SimpleNamespace(_play_metronome=play, beat_listeners=[])
+        session.attach(app)
+        session.start()
+        audio_thread = threading.Thread(target=app._play_metronome)
+        audio_thread.start()
+        time.sleep(0.1)
+        session.stop()
+        time.sleep(0.05)  # Let the thread run a few more beats
+        done.set()
+        audio_thread.join()
+
+        self.assertIsNone(profile_after_stop[-1])
+        self.assertFalse(session._thread_profiles)
+        stats = pstats.Stats(os.path.join(self.out_dir, 'profile.pstats'))
+        self.assertTrue(any(func[2] == 'busy_work' for func in stats.stats))
+
+    def test_stop_with_root_does_not_block_tk_thread(self):
+        session = profiler.SessionProfiler(1, out_dir=self.out_dir, interval=0.002, use_cprofile=True)
+        root = FakeTkRoot()
+        done = threading.Event()
+        between_tk_calls = threading.Event()
+        profile_after_stop = []
+
+        def play():
+            while not done.is_set():
+                between_tk_calls.clear()
+                root.call(lambda: 0)  # e.g. beat_count_var.get() before the listeners run
+                for listener in app.beat_listeners:
+                    listener(0, time.perf_counter())
+                if not session.running:
+                    profile_after_stop.append(sys.getprofile())
+                between_tk_calls.set()
+                busy_work(0.02)  # The rest of the beat, after which the loop needs Tk again
+
+        app = SimpleNamespace(_play_metronome=play, beat_listeners=[])
+        session.attach(app)
+        session.start()
+        # Daemon: if the handoff regresses, the thread stays parked in root.call()
+        audio_thread = threading.Thread(target=app._play_metronome, daemon=True)
+        audio_thread.start()
+        warmup_end = time.perf_counter() + 0.1
+        # Stop mid-beat, so the thread must go through Tk again before its next checkpoint
+        root.run_until(lambda: time.perf_counter() > warmup_end and between_tk_calls.is_set(), 2)
+        pstats_path = os.path.join(self.out_dir, 'profile.pstats')
+        with mock.patch.object(profiler.logging, 'warning') as warning:
+            started = time.perf_counter()
+            session.stop(root)
+            self.assertLess(time.perf_counter() - started, 0.5)
+            root.run_until(lambda: os.path.exists(pstats_path) and profile_after_stop,
+                           profiler.PROFILE_HANDOFF_TIMEOUT + 1)
+            done.set()
+            root.run_until(lambda: not audio_thread.is_alive(), 2)
+        self.assertFalse(audio_thread.is_alive())
+
+        warning.assert_not_called()
+        self.assertIsNone(profile_after_stop[-1])
+        stats = pstats.Stats(pstats_path)
+        self.assertTrue(any(func[2] == 'busy_work' for func in stats.stats))
+
+    def test_late_thread_profile_is_disabled_but_not_merged(self):
+        session = profiler.SessionProfiler(1, out_dir=self.out_dir, interval=0.002)
+        session.start()
+        late_profile = mock.MagicMock()
+        session._thread_profiles[12345] = (late_profile, threading.Event())
+        with mock.patch.object(profiler.logging, 'warning') as warning:
+            session.stop(handoff_timeout=0)
+        warning.assert_called_once()
+        session._release_thread_profile(12345)  # The thread reaches its checkpoint after the write
+        late_profile.disable.assert_called_once()
+        self.assertNotIn(late_profile, session._profiles)
+
+    def test_wrapped_target_runs_plain_when_not_profiling(self):
+        session = profiler.SessionProfiler(1, out_dir=self.out_dir)
+        wrapped = session.wrap_target('audio', lambda: 42)
+        self.assertEqual(wrapped(), 42)
+        self.assertFalse(session.samples)
+
+    def test_thread_cpu_time_current_thread(self):
+        self.assertIsNotNone(profiler.thread_cpu_time(threading.get_ident()))
+
+
+if __name__ == '__main__':
+    unittest.main()
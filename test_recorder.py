@@ -0,0 +1,172 @@
+import csv
+import os
+import shutil
+import tempfile
+import time
+import unittest
+import wave
+from unittest import mock
+
+import numpy
+
+# Mock pyaudio before importing the recorder (PortAudio may not be installed)
+mock_pyaudio = mock.MagicMock()
+
+with mock.patch.dict('sys.modules', {'pyaudio': mock_pyaudio}):
+    import recorder
+
+
+def write_test_wav(path, seconds=1.0, samplerate=8000):
+    samples = (numpy.arange(int(seconds * samplerate)) % 100).astype(numpy.int16)
+    with wave.open(path, 'wb') as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(samplerate)
+        wav.writeframes(samples.tobytes())
+    return samples
+
+
+class TestBlockRing(unittest.TestCase):
+    def test_push_peek_release(self):
+        ring = recorder.BlockRing(capacity=2, block_samples=4)
+        self.assertTrue(ring.push(numpy.array([1, 2, 3], dtype=numpy.int16).tobytes()))
+        block = ring.peek(timeout=0)
+        self.assertEqual(block.tolist(), [1, 2, 3])
+        ring.release()
+        self.assertEqual(len(ring), 0)
+        self.assertIsNone(ring.peek(timeout=0))
+
+    def test_full_ring_counts_overruns(self):
+        ring = recorder.BlockRing(capacity=2, block_samples=4)
+        block = numpy.zeros(4, dtype=numpy.int16).tobytes()
+        self.assertTrue(ring.push(block))
+        self.assertTrue(ring.push(block))
+        self.assertFalse(ring.push(block))
+        self.assertEqual(ring.overruns, 1)
+        self.assertEqual(len(ring), 2)
+
+
+class TestPracticeRecorder(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.source_path = os.path.join(self.test_dir, 'input.wav')
+        self.out_path = os.path.join(self.test_dir, 'take.wav')
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def record(self, source, ring_blocks=recorder.DEFAULT_RING_BLOCKS, beats=()):
+        rec = recorder.PracticeRecorder(self.out_path, ring_blocks=ring_blocks)
+        rec.start(source)
+        for beat_index, when in beats:
+            rec.mark_beat(beat_index, when)
+        source.finished.wait(timeout=5)
+        return rec.stop()
+
+    def test_streams_wav_input_to_disk(self):
+        samples = write_test_wav(self.source_path)
+        source = recorder.WavFileSource(self.source_path, block_frames=256)
+        stats = self.record(source)
+        self.assertEqual(stats.overruns, 0)
+        self.assertEqual(stats.frames_written, len(samples))
+        with wave.open(self.out_path, 'rb') as wav:
+            self.assertEqual(wav.getframerate(), 8000)
+            recorded = numpy.frombuffer(wav.readframes(wav.getnframes()), dtype=numpy.int16)
+        numpy.testing.assert_array_equal(recorded, samples)
+
+    def test_beat_markers_become_cue_points_and_sidecar(self):
+        write_test_wav(self.source_path)
+        source = recorder.WavFileSource(self.source_path, block_frames=256)
+        rec = recorder.PracticeRecorder(self.out_path)
+        rec.start(source)
+        for beat_index in range(6):
+            rec.mark_beat(beat_index, source.started_at + beat_index * 0.1)
+        source.finished.wait(timeout=5)
+        stats = rec.stop()
+
+        self.assertEqual(stats.markers, 6)
+        cues = recorder.read_cue_points(self.out_path)
+        self.assertEqual([label for _, label in cues][:5],
+                         ['bar 1 beat 1', 'bar 1 beat 2', 'bar 1 beat 3', 'bar 1 beat 4', 'bar 2 beat 1'])
+        self.assertEqual([position for position, _ in cues], [0, 800, 1600, 2400, 3200, 4000])
+        # Cue chunks must not disturb the audio data
+        with wave.open(self.out_path, 'rb') as wav:
+            self.assertEqual(wav.getnframes(), 8000)
+
+        with open(stats.sidecar_path, newline='') as sidecar:
+            rows = list(csv.DictReader(sidecar))
+        self.assertEqual(len(rows), 6)
+        self.assertEqual((rows[4]['bar'], rows[4]['beat']), ('2', '1'))
+
+    def test_realtime_markers_land_on_the_click(self):
+        write_test_wav(self.source_path)
+        source = recorder.WavFileSource(self.source_path, block_frames=256, realtime=True)
+        rec = recorder.PracticeRecorder(self.out_path, output_latency=0.01)
+        rec.start(source)
+        for beat_index in range(1, 4):
+            # Written 10 ms before it is heard, while the input is streaming
+            when = source.started_at + beat_index * 0.25 - 0.01
+            time.sleep(max(0.0, when - time.perf_counter()))
+            rec.mark_beat(beat_index, when)
+        source.finished.wait(timeout=5)
+        rec.stop()
+        cues = recorder.read_cue_points(self.out_path)
+        self.assertEqual([position for position, _ in cues], [2000, 4000, 6000])
+
+    def test_restarted_metronome_keeps_counting_bars(self):
+        write_test_wav(self.source_path)
+        source = recorder.WavFileSource(self.source_path, block_frames=256)
+        rec = recorder.PracticeRecorder(self.out_path)
+        rec.start(source)
+        for run_start, beats in ((0.0, 6), (0.5, 2)):
+            for beat_index in range(beats):
+                rec.mark_beat(beat_index, source.started_at + run_start + beat_index * 0.05)
+        source.finished.wait(timeout=5)
+        rec.stop()
+        labels = [label for _, label in recorder.read_cue_points(self.out_path)]
+        self.assertEqual(labels[5:], ['bar 2 beat 2', 'bar 3 beat 1', 'bar 3 beat 2'])
+
+    def test_slow_writer_counts_overruns(self):
+        write_test_wav(self.source_path)
+        source = recorder.WavFileSource(self.source_path, block_frames=64)
+        original_peek = recorder.BlockRing.peek
+
+        def slow_peek(ring, timeout=None):
+            time.sleep(0.01)
+            return original_peek(ring, timeout)
+
+        with mock.patch.object(recorder.BlockRing, 'peek', slow_peek):
+            stats = self.record(source, ring_blocks=2)
+        self.assertGreater(stats.overruns, 0)
+        self.assertEqual(stats.frames_written + stats.overruns * 64, 8000)
+
+    def test_failed_source_leaves_no_files(self):
+        source = mock.MagicMock(block_frames=256, channels=1, samplerate=8000)
+        source.start.side_effect = OSError("no input device")
+        rec = recorder.PracticeRecorder(self.out_path)
+        with self.assertRaises(OSError):
+            rec.start(source)
+        self.assertFalse(rec.is_recording)
+        self.assertEqual(os.listdir(self.test_dir), [])
+
+    def test_pyaudio_source_counts_input_overflows(self):
+        mock_pyaudio.paInputOverflow = 2
+        mock_pyaudio.paContinue = 0
+        pa = mock.MagicMock()
+        pa.open.return_value.get_input_latency.return_value = 0.5
+        source = recorder.PyAudioInputSource(pa, samplerate=8000, block_frames=4)
+        blocks = []
+        source.start(lambda data, captured_at: blocks.append((data, captured_at)))
+        self.assertEqual(pa.open.call_args.kwargs['stream_callback'], source._callback)
+        with mock.patch.object(recorder.time, 'perf_counter', return_value=100.0):
+            self.assertEqual(source._callback(b'\x00' * 8, 4, {}, 2), (None, 0))
+            source._callback(b'\x00' * 8, 4, {'input_buffer_adc_time': 7.0, 'current_time': 7.25}, 0)
+        self.assertEqual(source.input_overflows, 1)
+        # No timestamps: one block plus the input latency ago; otherwise from the ADC time
+        self.assertEqual(blocks, [(b'\x00' * 8, 100.0 - 0.0005 - 0.5), (b'\x00' * 8, 99.75)])
+        source.stop()
+        pa.open.return_value.close.assert_called_once()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,169 @@
+import unittest
+from unittest import mock
+
+import numpy  # Import before patching sys.modules: numpy cannot be re-imported once evicted
+
+# Mock tkinter and pyaudio before importing the harness (which imports main)
+mock_tk = mock.MagicMock()
+mock_ttk = mock.MagicMock()
+mock_pyaudio = mock.MagicMock()
+
+with mock.patch.dict('sys.modules', {
+    'tkinter': mock_tk,
+    'tkinter.ttk': mock_ttk,
+    'pyaudio': mock_pyaudio,
+    'tkinter.messagebox': mock.MagicMock(),
+}):
+    import soak
+
+
+class FakeIntVar:
+    # Minimal tk.IntVar replacement so BPM arithmetic works without Tk
+    def __init__(self, value=0):
+        self._value = value
+
+    def get(self):
+        return self._value
+
+    def set(self, value):
+        self._value = value
+
+
+class TrackingCanvas:
+    # Tracks items and tags the way a Tk canvas does
+    def __init__(self, forget_deletes=False):
+        self.items = {}
+        self.forget_deletes = forget_deletes  # Simulate a leak: delete() removes nothing
+        self._next_id = 1
+
+    def _create(self, tags=()):
+        item_id = self._next_id
+        self._next_id += 1
+        self.items[item_id] = set(tags)
+        return item_id
+
+    def create_rectangle(self, *coords, tags=(), **options):
+        return self._create(tags)
+
+    def create_window(self, *coords, tags=(), **options):
+        return self._create(tags)
+
+    def delete(self, tag_or_id):
+        if self.forget_deletes:
+            return
+        for item_id in [i for i, tags in self.items.items() if tag_or_id == i or tag_or_id in tags]:
+            del self.items[item_id]
+
+    def find_all(self):
+        return tuple(self.items)
+
+    def pack(self, **options):
+        pass
+
+    def bind(self, *args):
+        pass
+
+    def coords(self, *args):
+        pass
+
+
+class TestSimulatedClock(unittest.TestCase):
+    def test_sleep_advances_instantly(self):
+        clock = soak.SimulatedClock()
+        clock.sleep(2.5)
+        self.assertEqual(clock.perf_counter(), 2.5)
+        self.assertEqual(clock.time(), clock.epoch + 2.5)
+
+    def test_sleep_and_write_cost_time(self):
+        clock = soak.SimulatedClock(beat_overhead=0.001)
+        clock.sleep(0.5)
+        self.assertAlmostEqual(clock.now, 0.501)
+        stream = soak.NullPyAudio(clock).open(rate=8000)
+        stream.write(b'\x00\x00' * 800)
+        self.assertAlmostEqual(clock.now, 0.601)
+
+    def test_callbacks_fire_in_order_at_due_time(self):
+        clock = soak.SimulatedClock()
+        fired = []
+        clock.call_later(2.0, lambda: fired.append(('b', clock.now)))
+        clock.call_later(1.0, lambda: fired.append(('a', clock.now)))
+        cancelled = clock.call_later(1.5, lambda: fired.append(('x', clock.now)))
+        clock.cancel(cancelled)
+        clock.sleep(3.0)
+        self.assertEqual(fired, [('a', 1.0), ('b', 2.0)])
+        self.assertEqual(clock.now, 3.0)
+        self.assertEqual(clock.pending, 0)
+
+
+class TestSoakHarness(unittest.TestCase):
+    def setUp(self):
+        mock_tk.IntVar.side_effect = FakeIntVar
+        self.root = mock.MagicMock()
+
+    def tearDown(self):
+        mock_tk.IntVar.side_effect = None
+        mock_tk.Canvas.return_value = mock.MagicMock()
+
+    def test_short_run_passes(self):
+        # Mocked widgets record every call, so memory limits only apply to real Tk runs
+        # An ideal timer: the loop must make up for the time spent writing each click
+        harness = soak.SoakHarness(beats=3000, seed=3, checkpoints=5, root=self.root, beat_overhead=0,
+                                   max_rss_growth=None, max_traced_growth=None)
+        report = harness.run()
+        self.assertTrue(report.passed, report.summary())
+        self.assertEqual(report.beats, 3000)
+        self.assertGreater(report.runs, 1)
+        self.assertGreater(report.bpm_changes, 0)
+        self.assertLess(report.max_abs_error, 1e-6)
+        self.assertGreaterEqual(len(report.checkpoints), 5)
+        self.assertIsNotNone(report.growth('traced_bytes'))
+        self.root.destroy.assert_not_called()  # Caller owns the root
+
+    def test_default_overhead_reports_drift(self):
+        harness = soak.SoakHarness(beats=2000, seed=3, use_tracemalloc=False, root=self.root,
+                                   max_rss_growth=None)
+        report = harness.run()
+        self.assertFalse(report.passed)
+        self.assertGreater(report.max_abs_error, 0.001)
+        self.assertTrue(any("drifted" in failure for failure in report.failures))
+
+    def test_sleep_jitter_reports_drift(self):
+        harness = soak.SoakHarness(beats=2000, seed=3, sleep_jitter=0.002, beat_overhead=0,
+                                   use_tracemalloc=False, root=self.root)
+        report = harness.run()
+        self.assertFalse(report.passed)
+        self.assertGreater(report.max_abs_error, 0.001)
+        self.assertTrue(any("drifted" in failure for failure in report.failures))
+
+    def test_resizes_without_leak_pass_with_real_item_counts(self):
+        for seed in range(6):
+            mock_tk.Canvas.return_value = TrackingCanvas()
+            harness = soak.SoakHarness(beats=20000, seed=seed, use_tracemalloc=False, root=self.root,
+                                       beat_overhead=0, max_rss_growth=None)
+            report = harness.run()
+            self.assertGreater(report.resizes, 1)
+            self.assertEqual(report.growth('canvas_items'), 0, report.summary())
+            self.assertTrue(report.passed, report.summary())
+
+    def test_canvas_leak_fails(self):
+        mock_tk.Canvas.return_value = TrackingCanvas(forget_deletes=True)
+        harness = soak.SoakHarness(beats=20000, seed=0, use_tracemalloc=False, root=self.root,
+                                   beat_overhead=0, max_rss_growth=None)
+        report = harness.run()
+        self.assertFalse(report.passed)
+        self.assertTrue(any("canvas items" in failure for failure in report.failures))
+
+    def test_growth_beyond_threshold_fails(self):
+        harness = soak.SoakHarness(beats=10, root=self.root)
+        harness.report.checkpoints = [
+            soak.Checkpoint(beats=5, simulated_seconds=3.0, canvas_items=150, pending_callbacks=2),
+            soak.Checkpoint(beats=10, simulated_seconds=6.0, canvas_items=300, pending_callbacks=2),
+        ]
+        harness._evaluate()
+        self.assertEqual(len(harness.report.failures), 1)
+        self.assertIn("canvas items", harness.report.failures[0])
+        self.assertIn("FAILED", harness.report.summary())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,19 @@
+import unittest
+
+import numpy
+
+import synth
+
+
+class TestSynthesizeClick(unittest.TestCase):
+    def test_duration_scales_with_tempo_and_is_capped(self):
+        self.assertEqual(len(synth.synthesize_click(300, 44100)), int(0.02 * 44100))
+        self.assertEqual(len(synth.synthesize_click(60, 44100)), int(0.05 * 44100))
+        self.assertLessEqual(numpy.abs(synth.synthesize_click(120, 44100)).max(), 0.5)
+
+    def test_default_samplerate(self):
+        self.assertEqual(len(synth.synthesize_click(60)), int(0.05 * synth.SAMPLERATE))
+
+
+if __name__ == '__main__':
+    unittest.main()